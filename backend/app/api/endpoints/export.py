@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from ...services import export as export_service
+from ...services.auth import get_current_user
+
+router = APIRouter()
+
+@router.get("/export")
+async def export_data(
+    include_secrets: bool = False,
+    gzip: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    匯出 Apps 與 LINE Bot 設定為 NDJSON (可 gzip)，格式可直接給 migrate_json_to_db.py 匯入
+    """
+    filename = f"export-{datetime.now().strftime('%Y%m%d%H%M%S')}.ndjson"
+    media_type = "application/x-ndjson"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        export_service.stream_export(include_secrets=include_secrets, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
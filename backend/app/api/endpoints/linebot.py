@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List
 from sqlalchemy.orm import Session
-from ...schemas.linebot import LineBotConfig, LineBotConfigCreate, LineBotConfigUpdate, LineBotTestMessage
+from ...schemas.linebot import LineBotConfig, LineBotConfigCreate, LineBotConfigUpdate, LineBotTestMessage, LineBotBroadcastMessage
 from ...services import linebot as linebot_service
 from ...services.auth import get_current_user
 from ...core.database import get_db
@@ -77,12 +77,12 @@ async def test_linebot_config(
 
 @router.post("/linebot-configs/broadcast")
 async def broadcast_notification(
-    test_message: LineBotTestMessage,
+    broadcast_message: LineBotBroadcastMessage,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """向所有啟用的 LINE Bot 發送通知"""
-    results = await linebot_service.broadcast_notification(db, test_message.message)
+    results = await linebot_service.broadcast_notification(db, broadcast_message.message, broadcast_message.dedup_key)
     return {
         "status": "completed",
         "results": results,
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from ...core import profiling
+from ...services.auth import get_current_admin
+
+router = APIRouter()
+
+@router.get("/debug/profiles")
+async def get_profiles(current_user: dict = Depends(get_current_admin)):
+    """取得最近的慢請求 profile (需啟用 PROFILING_ENABLED)"""
+    return {
+        "enabled": profiling.PROFILING_ENABLED,
+        "threshold_ms": profiling.PROFILING_THRESHOLD_MS,
+        "profiles": profiling.get_recent_profiles(),
+    }
+
+@router.delete("/debug/profiles")
+async def clear_profiles(current_user: dict = Depends(get_current_admin)):
+    """清除已記錄的 profile"""
+    profiling.clear_profiles()
+    return {"status": "success"}
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 import shutil
 import os
 import uuid
 from ...services.auth import get_current_user
+from ...core.compression import write_precompressed
 from fastapi import Depends
 
 
@@ -27,6 +29,9 @@ async def upload_file(file: UploadFile = File(...), current_user: dict = Depends
         # Save the file
         with open(file_location, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
+
+        # Store .br/.gz siblings so the static mount never compresses per request
+        await run_in_threadpool(write_precompressed, file_location)
             
         # Return the URL
         # Construct absolute URL assuming localhost:8001 for now, or relative path
@@ -0,0 +1,243 @@
+import gzip
+import os
+import zlib
+from mimetypes import guess_type
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+
+try:
+    import brotli
+except ImportError:  # brotli 為選用套件，未安裝時只使用 gzip
+    brotli = None
+
+# 壓縮後效果有限或已經是壓縮格式的內容不再處理
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# 預先壓縮檔案的副檔名，依優先順序排列
+PRECOMPRESSED_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+# 預先壓縮使用的壓縮等級；brotli 預設的 11 對大檔案太慢
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 9
+
+# 超過此大小的檔案不產生壓縮副本
+PRECOMPRESS_MAX_SIZE = 10 * 1024 * 1024
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """解析 Accept-Encoding，回傳客戶端可接受的編碼 (排除 q=0)"""
+    encodings = set()
+    for part in accept_encoding.split(","):
+        name, *params = part.strip().lower().split(";")
+        name = name.strip()
+        if not name:
+            continue
+        q = "1"
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                q = value.strip()
+        try:
+            if float(q) <= 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(name)
+    return encodings
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = (content_type or "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def write_precompressed(path: str) -> list:
+    """
+    為靜態檔案寫入預先壓縮的 .br / .gz 副本
+
+    只在壓縮後確實變小時才保留副本，讓靜態檔案在回應時不需即時壓縮。
+    超過 PRECOMPRESS_MAX_SIZE 的檔案會略過。此函式為同步阻塞操作，
+    在 async handler 中請透過 run_in_threadpool 呼叫。
+
+    Args:
+        path: 原始檔案路徑
+
+    Returns:
+        list: 實際寫入的副本路徑
+    """
+    if not is_compressible(guess_type(path)[0]):
+        return []
+    if os.path.getsize(path) > PRECOMPRESS_MAX_SIZE:
+        return []
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    variants = [(".gz", gzip.compress(data, compresslevel=PRECOMPRESS_GZIP_LEVEL, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=PRECOMPRESS_BROTLI_QUALITY)))
+
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) >= len(data):
+            continue
+        variant_path = path + suffix
+        with open(variant_path, "wb") as f:
+            f.write(compressed)
+        written.append(variant_path)
+    return written
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    靜態檔案服務，若存在 .br / .gz 副本且客戶端接受該編碼，直接回傳副本
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        encodings = accepted_encodings(request_headers.get("accept-encoding", ""))
+        has_variant = False
+
+        for encoding, suffix in PRECOMPRESSED_VARIANTS:
+            variant_path = str(full_path) + suffix
+            try:
+                variant_stat = os.stat(variant_path)
+            except OSError:
+                continue
+            has_variant = True
+            if encoding not in encodings:
+                continue
+
+            response = FileResponse(
+                variant_path,
+                status_code=status_code,
+                stat_result=variant_stat,
+                media_type=guess_type(str(full_path))[0] or "text/plain",
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if has_variant:
+            # 同一個 URL 有多種編碼版本，未壓縮的回應也要讓快取依 Accept-Encoding 區分
+            response.headers.add_vary_header("Accept-Encoding")
+        return response
+
+
+class CompressionMiddleware:
+    """
+    依 Accept-Encoding 協商 br / gzip 壓縮回應內容
+
+    小於 minimum_size 的回應不壓縮；串流回應會逐塊壓縮後送出。
+    已帶有 Content-Encoding 的回應 (例如預先壓縮的靜態檔) 與
+    exclude_paths 底下的路徑會直接略過。
+    """
+
+    def __init__(self, app, minimum_size: int = 500, gzip_level: int = 6, brotli_quality: int = 4, exclude_paths: tuple = ()):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        encodings = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in encodings:
+            encoding = "br"
+        elif "gzip" in encodings:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream_send = send
+        self.start_message = None
+        self.passthrough = False
+        self.compressor = None
+
+    def _create_compressor(self):
+        if self.encoding == "br":
+            return brotli.Compressor(quality=self.middleware.brotli_quality)
+        # wbits=31 產生 gzip 格式
+        return zlib.compressobj(self.middleware.gzip_level, zlib.DEFLATED, 31)
+
+    def _compress(self, data: bytes, finish: bool) -> bytes:
+        if self.encoding == "br":
+            chunk = self.compressor.process(data)
+            return chunk + (self.compressor.finish() if finish else self.compressor.flush())
+        chunk = self.compressor.compress(data)
+        return chunk + self.compressor.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self.downstream_send(message)
+            return
+
+        if self.passthrough:
+            if self.start_message is not None:
+                await self.downstream_send(self.start_message)
+                self.start_message = None
+            await self.downstream_send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # 回應太小，壓縮不划算
+                self.passthrough = True
+                await self.downstream_send(self.start_message)
+                self.start_message = None
+                await self.downstream_send(message)
+                return
+
+            self.compressor = self._create_compressor()
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            compressed = self._compress(body, finish=not more_body)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(compressed))
+            await self.downstream_send(self.start_message)
+            self.start_message = None
+            await self.downstream_send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        compressed = self._compress(body, finish=not more_body)
+        await self.downstream_send({"type": "http.response.body", "body": compressed, "more_body": more_body})
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -10,6 +10,24 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Columns added to existing tables after they were first created: (table, column, DDL type)
+ADDED_COLUMNS = [
+    ("linebot_configs", "coalesce_enabled", "BOOLEAN DEFAULT FALSE"),
+    ("linebot_configs", "coalesce_window_seconds", "INTEGER DEFAULT 60"),
+]
+
+def upgrade_schema(bind):
+    """Add missing columns to existing tables; create_all never alters a table"""
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            if table not in existing_tables:
+                continue
+            columns = {c["name"] for c in inspector.get_columns(table)}
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
 def get_db():
     db = SessionLocal()
     try:
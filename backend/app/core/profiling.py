@@ -0,0 +1,180 @@
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from sqlalchemy import event
+from starlette.datastructures import Headers
+
+# 預設關閉；關閉時不註冊 middleware 與 SQL hook，不會有任何額外負擔
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_THRESHOLD_MS = float(os.getenv("PROFILING_THRESHOLD_MS", "500"))
+PROFILING_BUFFER_SIZE = int(os.getenv("PROFILING_BUFFER_SIZE", "50"))
+PROFILING_HEADER = "x-debug-profile"
+
+# 單一請求最多保留的 SQL 數量，以及判定為 N+1 的重複次數
+MAX_STATEMENTS = 200
+N_PLUS_ONE_THRESHOLD = 5
+
+# cProfile 輸出保留的函式數量
+PROFILE_TOP_FUNCTIONS = 30
+
+_current_profile = ContextVar("current_profile", default=None)
+_profile_ids = itertools.count(1)
+_recent_profiles = deque(maxlen=PROFILING_BUFFER_SIZE)
+
+# cProfile 以執行緒為單位掛 hook，第二個 enable() 會直接覆蓋前一個，
+# 因此同一時間只允許一個請求使用 cProfile
+_cprofile_lock = threading.Lock()
+
+
+class RequestProfile:
+    """單一請求的效能資料"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.statements = []
+        self.statement_counts = Counter()
+        self.statement_total_ms = Counter()
+        self.sql_count = 0
+        self.sql_total_ms = 0.0
+
+    def record_sql(self, statement: str, duration_ms: float):
+        self.sql_count += 1
+        self.sql_total_ms += duration_ms
+        self.statement_counts[statement] += 1
+        self.statement_total_ms[statement] += duration_ms
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append({"statement": statement, "duration_ms": round(duration_ms, 3)})
+
+    def n_plus_one_suspects(self) -> list:
+        """同一條 SQL 在單一請求內重複執行太多次，通常代表 N+1 查詢"""
+        return [
+            {
+                "statement": statement,
+                "count": count,
+                "total_ms": round(self.statement_total_ms[statement], 3),
+            }
+            for statement, count in self.statement_counts.most_common()
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+
+    def to_dict(self, status_code: int, duration_ms: float, forced: bool, cprofile_stats: str = None) -> dict:
+        return {
+            "id": next(_profile_ids),
+            "method": self.method,
+            "path": self.path,
+            "status_code": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "captured_at": datetime.now(timezone.utc).isoformat(),
+            "trigger": "header" if forced else "threshold",
+            "sql": {
+                "count": self.sql_count,
+                "total_ms": round(self.sql_total_ms, 3),
+                "statements": self.statements,
+                "truncated": self.sql_count > len(self.statements),
+            },
+            "n_plus_one": self.n_plus_one_suspects(),
+            "cprofile": cprofile_stats,
+        }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is None:
+        return
+    conn.info.setdefault("profiling_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    starts = conn.info.get("profiling_start")
+    if profile is None or not starts:
+        return
+    profile.record_sql(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+
+def install_sql_hooks(engine):
+    """在 engine 上註冊 SQL 計時的 event hook"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def get_recent_profiles() -> list:
+    """取得最近的 profile，新的在前"""
+    return list(reversed(_recent_profiles))
+
+
+def clear_profiles():
+    _recent_profiles.clear()
+
+
+def _format_cprofile(profiler: cProfile.Profile) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return stream.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    慢請求 profiler
+
+    每個請求都會記錄 SQL 與耗時，超過 PROFILING_THRESHOLD_MS 或帶有
+    X-Debug-Profile header 的請求會存入 ring buffer。帶 header 的請求
+    另外以 cProfile 取樣；由於 cProfile 以執行緒為單位，同時間在事件迴圈
+    上執行的其他請求也會出現在結果中。同一時間只有一個請求能使用
+    cProfile，其餘帶 header 的請求只記錄 SQL 與耗時 (cprofile 為 None)。
+    """
+
+    def __init__(self, app, threshold_ms: float = PROFILING_THRESHOLD_MS):
+        self.app = app
+        self.threshold_ms = threshold_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        forced = PROFILING_HEADER in Headers(scope=scope)
+        profile = RequestProfile(scope["method"], scope["path"])
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profiler = None
+        if forced and _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # 其他 profiling 工具已在使用 (Python 3.12+ 會拋出例外)
+                profiler = None
+                _cprofile_lock.release()
+
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            _current_profile.reset(token)
+            cprofile_stats = None
+            if profiler is not None:
+                try:
+                    profiler.disable()
+                    cprofile_stats = _format_cprofile(profiler)
+                finally:
+                    _cprofile_lock.release()
+
+            if forced or duration_ms >= self.threshold_ms:
+                _recent_profiles.append(profile.to_dict(status_code, duration_ms, forced, cprofile_stats))
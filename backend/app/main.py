@@ -1,13 +1,15 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from .api.endpoints import apps, upload, auth, linebot
-from .core.database import engine, Base
+from .api.endpoints import apps, upload, auth, linebot, export, profiling
+from .core.database import engine, Base, upgrade_schema
+from .core.compression import CompressionMiddleware, PrecompressedStaticFiles
+from .core.profiling import PROFILING_ENABLED, ProfilingMiddleware, install_sql_hooks
 from . import models
 import os
 
 # Create Database tables
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 app = FastAPI(title="Portal API")
 
@@ -20,17 +22,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress API responses; static files are served from precompressed siblings instead
+app.add_middleware(CompressionMiddleware, minimum_size=500, exclude_paths=("/static",))
+
+# Slow-request profiler, only wired up when enabled so it costs nothing otherwise
+if PROFILING_ENABLED:
+    install_sql_hooks(engine)
+    app.add_middleware(ProfilingMiddleware)
+
 # Mount Static Files
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 os.makedirs(STATIC_DIR, exist_ok=True) # Ensure static dir exists
 
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR), name="static")
 
 # Include Routers
 app.include_router(auth.router, prefix="/api", tags=["auth"])
 app.include_router(apps.router, prefix="/api", tags=["apps"])
 app.include_router(upload.router, prefix="/api", tags=["upload"])
 app.include_router(linebot.router, prefix="/api", tags=["linebot"])
+app.include_router(export.router, prefix="/api", tags=["export"])
+app.include_router(profiling.router, prefix="/api", tags=["debug"])
 
 
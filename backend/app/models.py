@@ -28,5 +28,7 @@ class LineBotConfig(Base):
     user_id = Column(String)  # 接收通知的 User ID 或 Group ID
     enabled = Column(Boolean, default=True)  # 是否啟用
     description = Column(Text, nullable=True)  # 描述
+    coalesce_enabled = Column(Boolean, default=False)  # 是否合併短時間內的重複通知
+    coalesce_window_seconds = Column(Integer, default=60)  # 合併時間窗 (秒)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
@@ -9,6 +9,8 @@ class LineBotConfigBase(BaseModel):
     user_id: str
     enabled: bool = True
     description: Optional[str] = None
+    coalesce_enabled: bool = False
+    coalesce_window_seconds: int = Field(default=60, ge=1, le=3600)
 
 class LineBotConfigCreate(LineBotConfigBase):
     pass
@@ -20,6 +22,8 @@ class LineBotConfigUpdate(BaseModel):
     user_id: Optional[str] = None
     enabled: Optional[bool] = None
     description: Optional[str] = None
+    coalesce_enabled: Optional[bool] = None
+    coalesce_window_seconds: Optional[int] = Field(default=None, ge=1, le=3600)
 
 class LineBotConfig(LineBotConfigBase):
     id: int
@@ -31,3 +35,7 @@ class LineBotConfig(LineBotConfigBase):
 
 class LineBotTestMessage(BaseModel):
     message: str = "這是一則測試通知訊息 🔔"
+
+class LineBotBroadcastMessage(BaseModel):
+    message: str
+    dedup_key: Optional[str] = None  # 合併用的 key，未指定時以訊息內容作為 key
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field
+
+# LINE 文字訊息長度上限
+LINE_TEXT_MAX_LENGTH = 5000
+
+# 摘要中保留給標題與結尾說明的長度，其餘空間才用來暫存訊息
+DIGEST_RESERVED_LENGTH = 200
+
+# submit() 的處理結果
+SEND_NOW = "send"
+COALESCED = "coalesced"
+DUPLICATE = "duplicate"
+
+
+@dataclass
+class _Target:
+    """摘要的接收對象 (LINE Bot 設定的快照，不依賴已關閉的 session)"""
+    id: int
+    name: str
+    channel_access_token: str
+    user_id: str
+
+
+@dataclass
+class _Bucket:
+    """同一個 token、同一個 dedup key 在一個時間窗內的通知"""
+    dedup_key: str
+    opened_at: float
+    targets: dict = field(default_factory=dict)
+    seen: set = field(default_factory=set)
+    pending: list = field(default_factory=list)
+    pending_length: int = 0
+    overflow: int = 0
+    dropped: int = 0
+
+    def add_pending(self, message: str):
+        """暫存訊息；超出摘要可容納的長度時只計數，不保留內容"""
+        line_length = len(message) + 3  # "- " 與換行
+        if self.pending_length + line_length > LINE_TEXT_MAX_LENGTH - DIGEST_RESERVED_LENGTH:
+            self.overflow += 1
+            return
+        self.pending.append(message)
+        self.pending_length += line_length
+
+
+def _fingerprint(message: str) -> bytes:
+    """seen 只保存訊息的雜湊，避免暫存大量原文"""
+    return hashlib.blake2b(message.encode("utf-8"), digest_size=16).digest()
+
+
+class NotificationCoalescer:
+    """
+    通知合併器
+
+    時間窗內第一則通知立即發送並開啟時間窗；窗內相同 dedup key 的後續通知
+    先暫存，窗口結束時合併成一則摘要，完全相同的訊息則直接捨棄。暫存量以
+    摘要長度上限為界，超出的通知只計數。
+    共用同一個 channel_access_token 的設定共用一個時間窗，摘要交給
+    send_func 一次送出，讓它可以用 multicast 合併接收者。時間窗開啟後
+    才加入的設定不會收到本次摘要，窗內的通知改為直接發送。
+    每則通知對每個設定只做 dict 查詢與 set 判斷，為 O(1)。
+    """
+
+    def __init__(self, send_func):
+        self._buckets = {}
+        self._tasks = set()
+        self._send_func = send_func
+
+    def submit(self, configs: list, dedup_key: str, message: str) -> dict:
+        """
+        提交一則通知給多個啟用合併模式的設定
+
+        Args:
+            configs: 已啟用合併模式的 LINE Bot 設定
+            dedup_key: 合併用的 key
+            message: 通知訊息內容
+
+        Returns:
+            dict: config_id -> SEND_NOW (需立即發送)、COALESCED (已暫存) 或 DUPLICATE (已捨棄)
+        """
+        groups = {}
+        for config in configs:
+            window = max(config.coalesce_window_seconds or 0, 0)
+            groups.setdefault((config.channel_access_token, dedup_key, window), []).append(config)
+
+        fingerprint = _fingerprint(message)
+        outcomes = {}
+        for key, group_configs in groups.items():
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = _Bucket(dedup_key=dedup_key, opened_at=time.time())
+                bucket.targets = {
+                    config.id: _Target(
+                        id=config.id,
+                        name=config.name,
+                        channel_access_token=config.channel_access_token,
+                        user_id=config.user_id,
+                    )
+                    for config in group_configs
+                }
+                self._buckets[key] = bucket
+                asyncio.get_running_loop().call_later(key[2], self._schedule_flush, key)
+                for config in group_configs:
+                    outcomes[config.id] = SEND_NOW
+                bucket.seen.add(fingerprint)
+                continue
+
+            duplicate = fingerprint in bucket.seen
+            for config in group_configs:
+                if config.id not in bucket.targets:
+                    # 時間窗開啟後才加入的設定不列入本次摘要，在下一個時間窗前都直接發送
+                    outcomes[config.id] = SEND_NOW
+                elif duplicate:
+                    outcomes[config.id] = DUPLICATE
+                else:
+                    outcomes[config.id] = COALESCED
+
+            group_outcomes = {outcomes[config.id] for config in group_configs}
+            if DUPLICATE in group_outcomes:
+                bucket.dropped += 1
+            elif COALESCED in group_outcomes:
+                bucket.add_pending(message)
+            bucket.seen.add(fingerprint)
+
+        return outcomes
+
+    def _schedule_flush(self, key):
+        task = asyncio.get_running_loop().create_task(self._flush(key))
+        # 保留 task 參照，避免尚未完成就被回收
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, key):
+        bucket = self._buckets.pop(key, None)
+        if bucket is None or not (bucket.pending or bucket.overflow):
+            return
+
+        results = await self._send_func(list(bucket.targets.values()), build_digest(bucket))
+        for result in results:
+            if not result["success"]:
+                print(f"Digest send error ({result['config_name']}): {result['message']}")
+
+    def pending_count(self) -> int:
+        """目前暫存中、尚未發送的通知數量"""
+        return sum(len(bucket.pending) + bucket.overflow for bucket in self._buckets.values())
+
+
+def build_digest(bucket: _Bucket) -> str:
+    """將暫存的通知組成一則摘要訊息"""
+    window = int(time.time() - bucket.opened_at)
+    total = len(bucket.pending) + bucket.overflow
+    lines = [f"[彙整通知] {bucket.dedup_key}", f"過去 {window} 秒內另有 {total} 則通知:"]
+    lines.extend(f"- {message}" for message in bucket.pending)
+    if bucket.overflow:
+        lines.append(f"(另有 {bucket.overflow} 則通知因長度限制未列出)")
+    if bucket.dropped:
+        lines.append(f"(已略過 {bucket.dropped} 則重複通知)")
+
+    digest = "\n".join(lines)
+    if len(digest) > LINE_TEXT_MAX_LENGTH:
+        digest = digest[:LINE_TEXT_MAX_LENGTH - 1] + "…"
+    return digest
@@ -0,0 +1,96 @@
+import json
+import zlib
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..core.database import SessionLocal
+from ..models import App, LineBotConfig
+
+EXPORT_FORMAT_VERSION = 1
+
+# 每次從 server-side cursor 取回的筆數
+YIELD_PER = 500
+
+# 累積到這個大小才送出一個 chunk，避免每行都觸發一次網路寫入
+CHUNK_SIZE = 64 * 1024
+
+REDACTED = "***REDACTED***"
+LINEBOT_SECRET_FIELDS = ("channel_access_token", "channel_secret")
+
+# 匯出的資料表：(record type, model, 需遮蔽的欄位)
+EXPORT_TABLES = (
+    ("app", App, ()),
+    ("linebot_config", LineBotConfig, LINEBOT_SECRET_FIELDS),
+)
+
+
+def _serialize_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_export_records(db: Session, include_secrets: bool = False):
+    """
+    逐筆產生匯出紀錄
+
+    第一筆為 meta 紀錄，之後依序為各資料表的資料列。查詢使用
+    yield_per 走 server-side cursor，記憶體用量不隨資料量成長。
+
+    Args:
+        db: 資料庫 session
+        include_secrets: 是否輸出 LINE Bot 的 token / secret
+
+    Yields:
+        dict: {"type": ..., "data": {...}}
+    """
+    yield {
+        "type": "meta",
+        "data": {
+            "version": EXPORT_FORMAT_VERSION,
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+            "secrets_redacted": not include_secrets,
+        },
+    }
+
+    for record_type, model, secret_fields in EXPORT_TABLES:
+        table = model.__table__
+        stmt = select(table).order_by(table.c.id).execution_options(yield_per=YIELD_PER)
+        for row in db.execute(stmt).mappings():
+            data = {key: _serialize_value(value) for key, value in row.items()}
+            if not include_secrets:
+                for field in secret_fields:
+                    if data.get(field):
+                        data[field] = REDACTED
+            yield {"type": record_type, "data": data}
+
+
+def stream_export(include_secrets: bool = False, compress: bool = False):
+    """
+    以 NDJSON 串流輸出匯出資料，可選擇 gzip 壓縮
+
+    串流期間自行開啟 session，因為 Depends(get_db) 的 session 會在
+    回應開始串流前就被關閉。
+
+    Yields:
+        bytes: NDJSON (或 gzip 後的 NDJSON) 資料片段
+    """
+    db = SessionLocal()
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = bytearray()
+    try:
+        for record in iter_export_records(db, include_secrets):
+            buffer += json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+            if len(buffer) >= CHUNK_SIZE:
+                chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+                buffer.clear()
+                if chunk:
+                    yield chunk
+
+        tail = bytes(buffer)
+        if compressor:
+            tail = compressor.compress(tail) + compressor.flush()
+        if tail:
+            yield tail
+    finally:
+        db.close()
@@ -1,8 +1,19 @@
 from sqlalchemy.orm import Session
 from ..models import LineBotConfig
 from ..schemas.linebot import LineBotConfigCreate, LineBotConfigUpdate
+from . import coalescer as coalescer_module
+from collections import OrderedDict
+import re
+from typing import Optional
+import asyncio
 import httpx
 
+# LINE multicast 單次最多 500 位接收者
+MULTICAST_MAX_RECIPIENTS = 500
+
+# 格式錯誤的 ID 會讓整個 multicast 請求被拒，因此只有符合格式的 User ID 才走 multicast
+USER_ID_PATTERN = re.compile(r"^U[0-9a-f]{32}$")
+
 def get_all_linebot_configs(db: Session):
     """取得所有 LINE Bot 設定"""
     return db.query(LineBotConfig).all()
@@ -59,11 +70,6 @@ async def send_line_message(channel_access_token: str, user_id: str, message: st
     Returns:
         dict: 包含成功狀態和訊息的字典
     """
-    url = "https://api.line.me/v2/bot/message/push"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {channel_access_token}"
-    }
     payload = {
         "to": user_id,
         "messages": [
@@ -73,7 +79,41 @@ async def send_line_message(channel_access_token: str, user_id: str, message: st
             }
         ]
     }
-    
+    result = await _post_line_message("push", channel_access_token, payload)
+    result.pop("status_code", None)
+    return result
+
+async def send_line_multicast(channel_access_token: str, user_ids: list, message: str) -> dict:
+    """
+    以 multicast 一次發送 LINE 訊息給多位使用者
+
+    Args:
+        channel_access_token: LINE Channel Access Token
+        user_ids: 接收者的 User ID 列表 (最多 500 個，不支援 Group/Room ID)
+        message: 要發送的訊息內容
+
+    Returns:
+        dict: 包含成功狀態和訊息的字典；HTTP 失敗時另含 status_code
+    """
+    payload = {
+        "to": user_ids,
+        "messages": [
+            {
+                "type": "text",
+                "text": message
+            }
+        ]
+    }
+    return await _post_line_message("multicast", channel_access_token, payload)
+
+async def _post_line_message(endpoint: str, channel_access_token: str, payload: dict) -> dict:
+    """呼叫 LINE Messaging API 的 push / multicast 端點"""
+    url = f"https://api.line.me/v2/bot/message/{endpoint}"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {channel_access_token}"
+    }
+
     try:
         async with httpx.AsyncClient() as client:
             response = await client.post(url, json=payload, headers=headers)
@@ -82,9 +122,120 @@ async def send_line_message(channel_access_token: str, user_id: str, message: st
                 return {"success": True, "message": "訊息發送成功"}
             else:
                 error_detail = response.json() if response.text else {"error": "Unknown error"}
-                return {"success": False, "message": f"發送失敗: {error_detail}"}
+                return {"success": False, "message": f"發送失敗: {error_detail}", "status_code": response.status_code}
     except Exception as e:
-        return {"success": False, "message": f"發送失敗: {str(e)}"}
+        return {"success": False, "message": f"發送失敗: {str(e)}", "status_code": None}
+
+def _is_user_id(target_id: str) -> bool:
+    """LINE 的 User ID 為 "U" + 32 位十六進位；Group ID ("C")、Room ID ("R") 或格式不符者只能用 push"""
+    return bool(target_id) and USER_ID_PATTERN.match(target_id) is not None
+
+def plan_broadcast(configs: list) -> list:
+    """
+    規劃廣播的發送批次
+
+    依 channel_access_token 將設定分組，同一個 token 下的 User ID
+    合併為 multicast 批次 (每批最多 MULTICAST_MAX_RECIPIENTS 個)，
+    Group/Room ID 則維持個別 push。
+
+    Args:
+        configs: 啟用的 LINE Bot 設定列表
+
+    Returns:
+        list: 批次列表，每個批次為 {"type", "token", "configs"}
+    """
+    groups = OrderedDict()
+    for config in configs:
+        groups.setdefault(config.channel_access_token, []).append(config)
+
+    batches = []
+    for token, token_configs in groups.items():
+        recipients = OrderedDict()
+        for config in token_configs:
+            if _is_user_id(config.user_id):
+                recipients.setdefault(config.user_id, []).append(config)
+            else:
+                batches.append({"type": "push", "token": token, "configs": [config]})
+
+        # 單一接收者不需要 multicast，直接 push 即可
+        if len(recipients) == 1:
+            batches.append({"type": "push", "token": token, "configs": next(iter(recipients.values()))})
+            continue
+
+        user_ids = list(recipients.keys())
+        for start in range(0, len(user_ids), MULTICAST_MAX_RECIPIENTS):
+            chunk = user_ids[start:start + MULTICAST_MAX_RECIPIENTS]
+            batches.append({
+                "type": "multicast",
+                "token": token,
+                "configs": [config for user_id in chunk for config in recipients[user_id]],
+            })
+
+    return batches
+
+async def _send_push_batch(token: str, configs: list, message: str) -> list:
+    """以 push 發送給同一個接收者的設定"""
+    result = await send_line_message(
+        channel_access_token=token,
+        user_id=configs[0].user_id,
+        message=message
+    )
+    return [(config, "push", result) for config in configs]
+
+async def _send_batch(batch: dict, message: str) -> list:
+    """
+    發送單一批次
+
+    multicast 回傳 4xx 時 (例如其中一個 ID 無效)，改以 push 逐一發送，
+    讓錯誤只出現在有問題的設定上。
+
+    Returns:
+        list: (設定, 發送方式, 結果) 的列表
+    """
+    if batch["type"] != "multicast":
+        return await _send_push_batch(batch["token"], batch["configs"], message)
+
+    user_ids = list(OrderedDict.fromkeys(config.user_id for config in batch["configs"]))
+    result = await send_line_multicast(batch["token"], user_ids, message)
+    status_code = result.pop("status_code", None)
+    if result["success"] or status_code is None or not 400 <= status_code < 500:
+        return [(config, "multicast", result) for config in batch["configs"]]
+
+    by_user_id = OrderedDict()
+    for config in batch["configs"]:
+        by_user_id.setdefault(config.user_id, []).append(config)
+    fallback_results = await asyncio.gather(
+        *(_send_push_batch(batch["token"], configs, message) for configs in by_user_id.values())
+    )
+    return [item for items in fallback_results for item in items]
+
+async def send_to_configs(configs: list, message: str) -> list:
+    """
+    依 plan_broadcast 規劃的批次發送訊息，並將結果對應回各個設定
+
+    Args:
+        configs: LINE Bot 設定列表
+        message: 訊息內容
+
+    Returns:
+        list: 各個設定的發送結果，順序與 configs 相同
+    """
+    batches = plan_broadcast(configs)
+    batch_results = await asyncio.gather(*(_send_batch(batch, message) for batch in batches))
+
+    results_by_config = {}
+    for items in batch_results:
+        for config, method, result in items:
+            results_by_config[config.id] = {
+                "config_id": config.id,
+                "config_name": config.name,
+                "method": method,
+                **result
+            }
+
+    return [results_by_config[config.id] for config in configs]
+
+coalescer = coalescer_module.NotificationCoalescer(send_func=send_to_configs)
 
 async def test_linebot_config(db: Session, config_id: int, message: str) -> dict:
     """
@@ -108,30 +259,43 @@ async def test_linebot_config(db: Session, config_id: int, message: str) -> dict
         message=message
     )
 
-async def broadcast_notification(db: Session, message: str) -> list:
+async def broadcast_notification(db: Session, message: str, dedup_key: Optional[str] = None) -> list:
     """
     向所有啟用的 LINE Bot 發送通知
+
+    啟用合併模式的設定會先交給 coalescer 判斷：時間窗內的後續通知
+    會被暫存成摘要，完全相同的訊息則直接捨棄。
     
     Args:
         db: 資料庫 session
         message: 通知訊息內容
+        dedup_key: 合併用的 key，未指定時以訊息內容作為 key
     
     Returns:
         list: 各個 LINE Bot 的發送結果
     """
     configs = get_enabled_linebot_configs(db)
-    results = []
-    
+
+    coalesced_configs = [config for config in configs if config.coalesce_enabled]
+    outcomes = coalescer.submit(coalesced_configs, dedup_key or message, message) if coalesced_configs else {}
+
+    to_send = []
+    results_by_config = {}
     for config in configs:
-        result = await send_line_message(
-            channel_access_token=config.channel_access_token,
-            user_id=config.user_id,
-            message=message
-        )
-        results.append({
-            "config_id": config.id,
-            "config_name": config.name,
-            **result
-        })
-    
-    return results
+        outcome = outcomes.get(config.id, coalescer_module.SEND_NOW)
+        if outcome == coalescer_module.SEND_NOW:
+            to_send.append(config)
+        else:
+            results_by_config[config.id] = {
+                "config_id": config.id,
+                "config_name": config.name,
+                "method": outcome,
+                "success": True,
+                "message": "已併入彙整通知" if outcome == coalescer_module.COALESCED else "重複通知已略過"
+            }
+
+    # 將發送結果對應回各個設定，並維持原本的設定順序
+    for result in await send_to_configs(to_send, message):
+        results_by_config[result["config_id"]] = result
+
+    return [results_by_config[config.id] for config in configs]
@@ -1,3 +1,5 @@
+import glob
+import gzip
 import json
 import os
 import sys
@@ -20,19 +22,32 @@ else:
         DATA_DIR = os.getcwd()
 
 try:
-    from app.core.database import SessionLocal, engine, Base
-    from app.models import User, App
+    from app.core.database import SessionLocal, engine, Base, upgrade_schema
+    from app.models import User, App, LineBotConfig
+    from app.services.export import REDACTED, EXPORT_FORMAT_VERSION
     from app.services.auth import get_password_hash
 except ImportError as e:
     print(f"Error importing app modules: {e}")
     print("Please ensure you are running this script from the project root or inside the container.")
     sys.exit(1)
 
-def migrate():
+def find_export_file():
+    """Return the newest export*.ndjson[.gz] file from GET /api/export, if any"""
+    candidates = []
+    for directory in {DATA_DIR, os.getcwd()}:
+        candidates += glob.glob(os.path.join(directory, 'export*.ndjson'))
+        candidates += glob.glob(os.path.join(directory, 'export*.ndjson.gz'))
+    if not candidates:
+        return None
+    return max(candidates, key=os.path.getmtime)
+
+def migrate(export_path=None):
     print("Starting database migration...")
     
     # Create tables if they don't exist
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+
     db = SessionLocal()
 
     # Helper to find file
@@ -101,8 +116,71 @@ def migrate():
     else:
         print("No apps.json found, skipping app migration.")
 
+    # 3. Import NDJSON export produced by GET /api/export
+    export_source = export_path or find_export_file()
+    if export_source:
+        print(f"Processing export from {export_source}...")
+        try:
+            opener = gzip.open if export_source.endswith('.gz') else open
+            with opener(export_source, 'rt', encoding='utf-8') as f:
+                app_count = 0
+                config_count = 0
+                skipped = 0
+                meta_checked = False
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    data = record['data']
+                    if not meta_checked:
+                        # The first record describes the export format
+                        if record['type'] != 'meta':
+                            raise ValueError("missing meta record")
+                        if data.get('version') != EXPORT_FORMAT_VERSION:
+                            raise ValueError(
+                                f"unsupported export version {data.get('version')} "
+                                f"(expected {EXPORT_FORMAT_VERSION})"
+                            )
+                        meta_checked = True
+                        continue
+                    if record['type'] == 'app':
+                        exists = db.query(App).filter(App.title == data['title']).first()
+                        if not exists:
+                            db.add(App(
+                                title=data['title'],
+                                icon_url=data['icon_url'],
+                                link_url=data['link_url'],
+                                description=data.get('description') or ''
+                            ))
+                            app_count += 1
+                    elif record['type'] == 'linebot_config':
+                        # Redacted exports carry no usable credentials
+                        if REDACTED in (data['channel_access_token'], data['channel_secret']):
+                            skipped += 1
+                            continue
+                        exists = db.query(LineBotConfig).filter(LineBotConfig.name == data['name']).first()
+                        if not exists:
+                            db.add(LineBotConfig(
+                                name=data['name'],
+                                channel_access_token=data['channel_access_token'],
+                                channel_secret=data['channel_secret'],
+                                user_id=data['user_id'],
+                                enabled=data.get('enabled', True),
+                                description=data.get('description'),
+                                coalesce_enabled=data.get('coalesce_enabled') or False,
+                                coalesce_window_seconds=data.get('coalesce_window_seconds') or 60
+                            ))
+                            config_count += 1
+                db.commit()
+                print(f"  - Added {app_count} new apps and {config_count} new LINE Bot configs.")
+                if skipped:
+                    print(f"  - Skipped {skipped} LINE Bot configs with redacted secrets.")
+        except Exception as e:
+            print(f"  - Error processing export: {e}")
+
     db.close()
     print("Migration completed successfully.")
 
 if __name__ == "__main__":
-    migrate()
+    # Optional argument: path to an export file, e.g. export-20250101120000.ndjson.gz
+    migrate(sys.argv[1] if len(sys.argv) > 1 else None)
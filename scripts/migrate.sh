@@ -1,7 +1,8 @@
 #!/bin/bash
 #
 # 資料庫遷移腳本
-# 用法: ./scripts/migrate.sh
+# 用法: ./scripts/migrate.sh [容器內的匯出檔路徑]
+#   未指定時會自動匯入最新的 export*.ndjson[.gz] (由 GET /api/export 產生)
 #
 set -e
 
@@ -33,7 +34,7 @@ log_info "在 ${CONTAINER_NAME} 中執行遷移腳本..."
 
 # 執行遷移
 if [ -f "$PROJECT_DIR/migrate_json_to_db.py" ]; then
-    cat "$PROJECT_DIR/migrate_json_to_db.py" | docker exec -i ${CONTAINER_NAME} python3 -
+    cat "$PROJECT_DIR/migrate_json_to_db.py" | docker exec -i ${CONTAINER_NAME} python3 - "$@"
 else
     log_info "無遷移腳本需要執行"
     exit 0